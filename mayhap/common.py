@@ -15,7 +15,6 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 from sys import stderr
-from traceback import format_exc
 
 
 def join_as_strings(objects, delimiter=''):
@@ -25,6 +24,9 @@ def join_as_strings(objects, delimiter=''):
 
 def print_error(e, verbose=True):
     if verbose:
+        # Only pay for the traceback module when a traceback is wanted
+        # pylint: disable=import-outside-toplevel
+        from traceback import format_exc
         print(format_exc(), file=stderr)
     elif isinstance(e, MayhapGrammarError):
         print(e, file=stderr)
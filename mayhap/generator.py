@@ -14,16 +14,16 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from copy import deepcopy
+from itertools import accumulate
 import random
 from sys import stderr
 
 from .common import MayhapError, join_as_strings, print_error
 from .modifiers import (MOD_MUNDANE,
-                        apply_modifier,
+                        compose_modifiers,
                         resolve_plurals)
 from .parse import parse_rule
-from .rule import choose_rule
+from .rule import accumulate_weights, choose_weighted
 from .tokens import (LiteralToken,
                      PatternToken,
                      RangeToken,
@@ -39,39 +39,78 @@ class MayhapGenerator:
         self.persistent = persistent
         self.verbose = verbose
         self.variables = {}
-        self.unused = deepcopy(self.grammar)
+        # Maps each symbol to the indices of its rules that have not been used
+        # Filled lazily, the first time a symbol is produced
+        self.unused = {}
+        self.cum_weights = {}
 
     def reset(self):
         self.variables = {}
-        self.unused = deepcopy(self.grammar)
+        self.unused = {}
+
+    def invalidate(self, symbol):
+        '''
+        Discard the cached weights and unused rules of the given symbol. Must
+        be called whenever the rules of a symbol in the grammar are changed.
+        '''
+        self.cum_weights.pop(symbol, None)
+        self.unused.pop(symbol, None)
 
     def produce(self, symbol, unique=True):
-        if unique:
-            # If all symbols have been used, old symbols must be reused
-            # Recreate and draw from the unused list again to reduce duplicates
-            rules = self.unused.get(symbol)
-            if rules is None:
-                raise MayhapError(f'Symbol not found: {symbol}')
+        rules = self.grammar.get(symbol)
+        if rules is None:
+            raise MayhapError(f'Symbol not found: {symbol}')
+        if not rules:
+            raise MayhapError(f'Symbol has no rules: {symbol}')
+        unused = self.unused.get(symbol)
 
-            if len(rules) == 0:
-                self.unused[symbol] = self.grammar[symbol].copy()
+        if symbol not in self.cum_weights:
+            self.cum_weights[symbol] = accumulate_weights(rules)
+        cum_weights = self.cum_weights[symbol]
 
-            rule = choose_rule(self.unused[symbol])
-            self.unused[symbol].remove(rule)
-            return rule
+        if unique:
+            # If all rules have been used, old rules must be reused
+            # Refill and draw from the unused rules again to reduce duplicates
+            if not unused:
+                unused = self.unused[symbol] = list(range(len(rules)))
 
-        rules = self.grammar[symbol]
-        if rules is None:
-            raise MayhapError(f'Symbol not found: {symbol}')
-        rule = choose_rule(rules)
-        if rule in self.unused[symbol]:
-            self.unused[symbol].remove(rule)
-        return rule
+            if cum_weights is None:
+                position = random.randrange(len(unused))
+            else:
+                unused_cum_weights = tuple(accumulate(rules[i].weight
+                                                      for i in unused))
+                if unused_cum_weights[-1] > 0:
+                    position = choose_weighted(range(len(unused)),
+                                               unused_cum_weights)
+                else:
+                    # Only rules that can never be chosen are left unused, so
+                    # start over with every rule
+                    unused = self.unused[symbol] = list(range(len(rules)))
+                    position = choose_weighted(range(len(rules)), cum_weights)
+
+            # The order of the unused rules does not matter, so move the last
+            # one into the chosen one's place rather than shifting the rest
+            index = unused[position]
+            unused[position] = unused[-1]
+            unused.pop()
+            return rules[index]
+
+        index = choose_weighted(range(len(rules)), cum_weights)
+        # Record the draw even if the symbol has not been produced uniquely
+        # yet, so that later unique draws avoid it
+        if unused is None:
+            unused = self.unused[symbol] = list(range(len(rules)))
+        try:
+            unused.remove(index)
+        except ValueError:
+            pass
+        return rules[index]
 
     def log(self, string='', tokens=None, depth=0):
         '''
         Log the given pattern to standard error, indented by its recursion
-        depth for readability.
+        depth for readability. Hot paths check self.verbose before calling
+        this, to avoid building its arguments when nothing will be logged.
         '''
         if self.verbose:
             if tokens is None:
@@ -83,17 +122,20 @@ class MayhapGenerator:
         if isinstance(token, str):
             return token
 
-        self.log(tokens=[token], depth=depth)
+        verbose = self.verbose
+        if verbose:
+            self.log(tokens=[token], depth=depth)
 
         if isinstance(token, ChoiceToken):
-            rule = choose_rule(token.rules)
+            rule = choose_weighted(token.rules, token.cum_weights)
             return self.evaluate_tokens(rule.tokens, depth=depth + 1)
 
         if isinstance(token, AssignmentToken):
             variable = token.variable
             value = self.evaluate_tokens(token.value, depth=depth + 1)
-            self.log(tokens=[AssignmentToken(variable, value, token.echo)],
-                     depth=depth)
+            if verbose:
+                self.log(tokens=[AssignmentToken(variable, value, token.echo)],
+                         depth=depth)
             self.variables[variable] = value
             return value if token.echo else ''
 
@@ -102,15 +144,15 @@ class MayhapGenerator:
         elif isinstance(token, PatternToken):
             string = self.evaluate_tokens(token.tokens, depth=depth + 1)
         elif isinstance(token, RangeToken):
-            choice = random.choice(token.range)
-            if token.alpha:
-                string = chr(choice)
+            values = token.values
+            if values is not None:
+                string = random.choice(values)
             else:
-                string = str(choice)
+                string = str(random.randrange(token.range.start,
+                                              token.range.stop))
         elif isinstance(token, SymbolToken):
-            symbol = self.evaluate_tokens(token.symbol, depth=depth + 1)
             unique = MOD_MUNDANE not in token.modifiers
-            rule = self.produce(symbol, unique)
+            rule = self.produce(token.symbol, unique)
             string = self.evaluate_tokens(rule.tokens, depth=depth + 1)
         elif isinstance(token, VariableToken):
             variable = token.variable
@@ -120,24 +162,37 @@ class MayhapGenerator:
             string = value
 
         if token.modifiers:
-            self.log(tokens=[LiteralToken(string, token.modifiers)],
-                     depth=depth)
-            for modifier in token.modifiers:
-                string = apply_modifier(string, modifier)
+            if verbose:
+                self.log(tokens=[LiteralToken(string, token.modifiers)],
+                         depth=depth)
+            string = compose_modifiers(token.modifiers)(string)
 
-        self.log(string=string, depth=depth)
+        if verbose:
+            self.log(string=string, depth=depth)
 
         return string
 
     def evaluate_tokens(self, tokens, depth=0):
-        string = ''
+        verbose = self.verbose
+        # Rules of plain text are parsed into a single string, which only
+        # needs its plurals resolved
+        if not verbose and len(tokens) == 1 and isinstance(tokens[0], str):
+            return resolve_plurals(tokens[0])
+
+        parts = []
 
         for i, token in enumerate(tokens):
             if isinstance(token, str):
-                string += token
+                parts.append(token)
             else:
-                self.log(string=string, tokens=tokens[i:], depth=depth)
-                string += self.evaluate_token(token, depth=depth + 1)
+                if verbose:
+                    self.log(string=''.join(parts), tokens=tokens[i:],
+                             depth=depth)
+                parts.append(self.evaluate_token(token, depth=depth + 1))
+
+        string = ''.join(parts)
+        if not verbose:
+            return resolve_plurals(string)
 
         if len(tokens) > 1:
             self.log(string=string, depth=depth)
@@ -172,7 +227,9 @@ class MayhapGenerator:
             print(self.evaluate_input(pattern))
             return True
         except MayhapError as e:
-            print_error(e, self.verbose)
+            # Errors in input patterns are expected; the verbose evaluation
+            # trace already shows where they happened, so skip the traceback
+            print_error(e, verbose=False)
             return False
         finally:
             if not self.persistent:
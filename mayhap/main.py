@@ -1,11 +1,12 @@
 from argparse import ArgumentParser, FileType
-from os import chdir, isatty
+from os import environ, isatty
 from os.path import dirname
-from sys import stderr, stdin
+from sys import stderr, stdin, stdout
 
 from .common import MayhapError, join_as_strings, print_error
 from .generator import MayhapGenerator
-from .parse import grammar_to_string, parse_grammar, validate_grammar
+from .optimize import optimize_grammar
+from .parse import grammar_to_string, load_grammar, validate_grammar
 from .shell import MayhapShell
 
 
@@ -53,12 +54,14 @@ def main():
     interactive_group.add_argument(
             '-i', '--interactive',
             action='store_true',
-            help='run as an interactive shell (default if reading from a TTY)')
+            help='run as an interactive shell (default if reading from and '
+                 'writing to a TTY, unless MAYHAP_BATCH is set)')
     interactive_group.add_argument(
             '-b', '--batch',
             action='store_true',
             help='use non-interactive batch processing mode (default if '
-                 'reading from a pipe)')
+                 'reading from or writing to a pipe, or if the MAYHAP_BATCH '
+                 'environment variable is set)')
     interactive_group.add_argument(
             '-t', '--test',
             action='store_true',
@@ -68,6 +71,18 @@ def main():
             '-p', '--persistent',
             action='store_true',
             help='carry over uniqueness and variable values across queries')
+    parser.add_argument(
+            '-c', '--cache',
+            action='store_true',
+            help='cache the parsed grammar in a .cache file beside each '
+                 'grammar file, and reuse it while the grammar is unchanged')
+    parser.add_argument(
+            '-O', '--optimize',
+            action='store_true',
+            help='optimize the grammar before generating by inlining symbols '
+                 'with only one rule and evaluating constant patterns; '
+                 'inlined symbols are not shown in verbose output; ignored '
+                 'by the interactive shell, where symbols can be edited')
     parser.add_argument(
             '-v', '--verbose',
             action='store_true',
@@ -75,14 +90,29 @@ def main():
                  'stderr, so stdout is still clean')
     args = parser.parse_args()
 
-    if args.grammar:
-        # Change working directory to directory containing the given grammar
-        # This allows for import paths relative to the given grammar
-        chdir(dirname(args.grammar.name))
+    if args.test or args.pattern:
+        use_shell = False
+    elif args.interactive:
+        use_shell = True
+    elif args.batch:
+        use_shell = False
+    else:
+        # The shell is only worth its overhead when a user is at the terminal
+        use_shell = (isatty(stdin.fileno()) and
+                     isatty(stdout.fileno()) and
+                     not environ.get('MAYHAP_BATCH'))
 
+    # Import paths are relative to the directory containing the grammar
+    grammar_dir = dirname(args.grammar.name) if args.grammar else ''
+    if args.grammar:
         try:
-            grammar = parse_grammar(args.grammar)
+            grammar = load_grammar(args.grammar, args.grammar.name,
+                                   args.cache, base_dir=grammar_dir)
             validate_grammar(grammar)
+            # The shell edits symbols in place, which inlined references to
+            # them would never see
+            if args.optimize and not use_shell:
+                grammar = optimize_grammar(grammar)
         except MayhapError as e:
             print_error(e, args.verbose)
             return 1
@@ -105,23 +135,17 @@ def main():
     if args.pattern:
         return 0 if generator.handle_input(args.pattern) else 1
 
-    if args.interactive:
-        use_shell = True
-    elif args.batch:
-        use_shell = False
-    else:
-        use_shell = isatty(stdin.fileno())
-
     # Otherwise, read standard input
     try:
         if use_shell:
-            MayhapShell(generator).cmdloop()
+            MayhapShell(generator, grammar_dir).cmdloop()
         else:
+            # Iterating stdin reads through its buffer a block at a time, and
+            # still answers each line as soon as it arrives through a pipe
+            handle_input = generator.handle_input
             for line in stdin:
-                # Strip trailing newline
-                line = line[:-1]
-                success = generator.handle_input(line)
-                if not success:
+                # Strip trailing newline, which the last line may lack
+                if not handle_input(line.rstrip('\n')):
                     return 1
     except KeyboardInterrupt:
         # Quietly handle SIGINT, like cat does
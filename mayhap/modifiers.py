@@ -1,3 +1,4 @@
+from functools import lru_cache
 import re
 import typing
 
@@ -35,22 +36,16 @@ MOD_UPPER = 'upper'
 # Convert to title case (capitalize the first letter of each word)
 MOD_TITLE = 'title'
 
-MODIFIERS = set((
-    MOD_MUNDANE,
-    MOD_ARTICLE,
-    MOD_PLURAL,
-    MOD_ORDINAL,
-    MOD_CAPITALIZE,
-    MOD_LOWER,
-    MOD_UPPER,
-    MOD_TITLE,
-))
-
 # Matches dynamic pluralization
 # e.g. (s)
 RE_PLURAL = re.compile(r'\((s)\)', re.IGNORECASE)
 
 
+# Inflections are pure functions of their input, but inflect is slow to
+# compute them, and generated text tends to reuse the same words, so they are
+# cached
+
+@lru_cache(maxsize=4096)
 def get_article(word):
     if INFLECT:
         return INFLECT.a(word).split()[0]
@@ -59,12 +54,15 @@ def get_article(word):
     return 'a'
 
 
+@lru_cache(maxsize=4096)
 def add_article(word):
     if INFLECT:
         return INFLECT.a(word)
     return get_article(word) + ' ' + word
 
 
+# 1 and 1.0 are equal but may pluralize differently, so cache them apart
+@lru_cache(maxsize=4096, typed=True)
 def get_plural(word, number=None):
     if INFLECT:
         if number is not None:
@@ -75,31 +73,51 @@ def get_plural(word, number=None):
     return word + 's'
 
 
+def find_plural_context(pattern, end):
+    '''
+    Scan backwards from the given end index for the word to pluralize and the
+    closest number before it. Return the start index of the word and the
+    number string, which is empty if there is no number. The scan walks
+    indices in place rather than copying the reversed pattern.
+    '''
+    i = end - 1
+    while i >= 0 and pattern[i].isalpha():
+        i -= 1
+    word_start = i + 1
+
+    number_start = None
+    number_end = None
+    while i >= 0:
+        character = pattern[i]
+        if (character.isdigit() or
+                (number_end is not None and
+                    character in '-.' and
+                    pattern[number_start] not in '-.')):
+            if number_end is None:
+                number_end = i + 1
+            number_start = i
+        elif number_end is not None:
+            break
+        i -= 1
+
+    if number_end is None:
+        return word_start, ''
+    return word_start, pattern[number_start:number_end]
+
+
 def resolve_plurals(pattern):
-    output = ''
+    # Most strings have no plural markers, so skip the scan for them
+    if '(' not in pattern:
+        return pattern
+    parts = []
     last_match = 0
     for match in RE_PLURAL.finditer(pattern):
-        # Find the previous number
-        previous_word = ''
-        previous_number = ''
-        building_word = True
-        for offset, character in enumerate(pattern[match.start() - 1::-1]):
-            if building_word:
-                if character.isalpha():
-                    previous_word = character + previous_word
-                    continue
-                previous_word_start = match.start() - offset
-                building_word = False
-            if (character.isdigit() or
-                    (previous_number and
-                        character in '-.' and
-                        previous_number[0] not in '-.')):
-                previous_number = character + previous_number
-            elif previous_number:
-                break
+        word_start, previous_number = find_plural_context(pattern,
+                                                          match.start())
+        previous_word = pattern[word_start:match.start()]
 
         if previous_word:
-            output += pattern[last_match:previous_word_start]
+            parts.append(pattern[last_match:word_start])
 
             if previous_number:
                 if '.' in previous_number:
@@ -111,16 +129,17 @@ def resolve_plurals(pattern):
             else:
                 previous_word = get_plural(previous_word)
 
-            output += previous_word
+            parts.append(previous_word)
         else:
-            output += pattern[last_match:match.start()]
-            output += match[1]
+            parts.append(pattern[last_match:match.start()])
+            parts.append(match[1])
 
         last_match = match.end()
-    output += pattern[last_match:]
-    return output
+    parts.append(pattern[last_match:])
+    return ''.join(parts)
 
 
+@lru_cache(maxsize=4096)
 def get_ordinal(number):
     if INFLECT:
         return INFLECT.ordinal(number)
@@ -135,21 +154,45 @@ def get_ordinal(number):
     return f'{number}th'
 
 
+# Maps each modifier to the function that applies it
+MODIFIERS = {
+    MOD_MUNDANE: lambda string: string,
+    MOD_ARTICLE: add_article,
+    MOD_PLURAL: get_plural,
+    MOD_ORDINAL: get_ordinal,
+    MOD_CAPITALIZE: str.capitalize,
+    MOD_LOWER: str.lower,
+    MOD_UPPER: str.upper,
+    MOD_TITLE: str.title,
+}
+
+
 def apply_modifier(string, modifier):
-    if modifier == MOD_PLURAL:
-        return get_plural(string)
-    if modifier == MOD_ARTICLE:
-        return add_article(string)
-    if modifier == MOD_ORDINAL:
-        return get_ordinal(string)
-    if modifier == MOD_CAPITALIZE:
-        return string.capitalize()
-    if modifier == MOD_LOWER:
-        return string.lower()
-    if modifier == MOD_UPPER:
-        return string.upper()
-    if modifier == MOD_TITLE:
-        return string.title()
-    if modifier == MOD_MUNDANE:
+    function = MODIFIERS.get(modifier)
+    if function is None:
+        raise MayhapError(f'Unknown modifier "{modifier}"')
+    return function(string)
+
+
+@lru_cache(maxsize=1024)
+def compose_modifiers(modifiers):
+    '''
+    Compose the given tuple of modifiers into a single function that applies
+    each of them in turn. Composed functions are cached by their modifiers, so
+    every token with the same modifiers shares one function.
+    '''
+    functions = []
+    for modifier in modifiers:
+        function = MODIFIERS.get(modifier)
+        if function is None:
+            raise MayhapError(f'Unknown modifier "{modifier}"')
+        functions.append(function)
+
+    if len(functions) == 1:
+        return functions[0]
+
+    def apply_modifiers(string):
+        for function in functions:
+            string = function(string)
         return string
-    raise MayhapError(f'Unknown modifier "{modifier}"')
+    return apply_modifiers
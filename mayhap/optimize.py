@@ -0,0 +1,127 @@
+# Mayhap - A grammar-based random text generator, inspired by Perchance
+# Copyright (C) 2022 Aaron Friesen
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with this program.  If not, see <https://www.gnu.org/licenses/>.
+
+from .modifiers import compose_modifiers, resolve_plurals
+from .parse import simplify_tokens
+from .rule import Rule
+from .tokens import (AssignmentToken,
+                     ChoiceToken,
+                     PatternToken,
+                     SymbolToken)
+
+
+def evaluate_static(string, modifiers):
+    '''
+    Evaluate a pattern made up of a single string the same way the generator
+    would, resolving its plurals and applying the given modifiers.
+    '''
+    string = resolve_plurals(string)
+    if modifiers:
+        string = compose_modifiers(modifiers)(string)
+    return string
+
+
+def make_pattern(tokens, modifiers=None):
+    '''
+    Make a token that evaluates the given tokens as a pattern. Patterns of
+    nothing but text are evaluated in advance and replaced by their output.
+    '''
+    if not tokens:
+        return evaluate_static('', modifiers)
+    if len(tokens) == 1 and isinstance(tokens[0], str):
+        return evaluate_static(tokens[0], modifiers)
+    return PatternToken(tokens, modifiers)
+
+
+class GrammarOptimizer:
+    def __init__(self, grammar):
+        self.grammar = grammar
+        # Maps each symbol with only one rule to the optimized tokens of the
+        # rule, or None if the symbol cannot be inlined
+        self.inlined = {}
+        self.visiting = set()
+        self.recursive = set()
+
+    def inline_symbol(self, symbol):
+        '''
+        Return the optimized tokens of the given symbol's rule if the symbol
+        has exactly one rule that can be produced. Otherwise, return None.
+        '''
+        if symbol in self.inlined:
+            return self.inlined[symbol]
+
+        # Recursive symbols cannot be inlined, or inlining would never end
+        if symbol in self.visiting:
+            self.recursive.add(symbol)
+            return None
+
+        rules = self.grammar.get(symbol)
+        if rules is None or len(rules) != 1 or rules[0].weight <= 0:
+            return None
+
+        self.visiting.add(symbol)
+        tokens = self.optimize_tokens(rules[0].tokens)
+        self.visiting.remove(symbol)
+        if symbol in self.recursive:
+            tokens = None
+        self.inlined[symbol] = tokens
+        return tokens
+
+    def optimize_token(self, token):
+        if isinstance(token, SymbolToken):
+            tokens = self.inline_symbol(token.symbol)
+            if tokens is None:
+                return token
+            return make_pattern(tokens, token.modifiers)
+
+        if isinstance(token, PatternToken):
+            return make_pattern(self.optimize_tokens(token.tokens),
+                                token.modifiers)
+
+        if isinstance(token, AssignmentToken):
+            return AssignmentToken(token.variable,
+                                   self.optimize_tokens(token.value),
+                                   token.echo)
+
+        if isinstance(token, ChoiceToken):
+            rules = tuple(self.optimize_rule(rule) for rule in token.rules)
+            if len(rules) == 1 and rules[0].weight > 0:
+                return make_pattern(rules[0].tokens)
+            return ChoiceToken(rules)
+
+        return token
+
+    def optimize_tokens(self, tokens):
+        return simplify_tokens([self.optimize_token(token)
+                                for token in tokens])
+
+    def optimize_rule(self, rule):
+        return Rule(self.optimize_tokens(rule.tokens), rule.weight)
+
+    def optimize(self):
+        return {symbol: [self.optimize_rule(rule) for rule in rules]
+                for symbol, rules in self.grammar.items()}
+
+
+def optimize_grammar(grammar):
+    '''
+    Return an equivalent grammar that is faster to generate from. References to
+    symbols with exactly one rule are replaced by the tokens of that rule,
+    choices between a single rule are replaced by its tokens, text-only
+    patterns are evaluated in advance, and adjacent strings are joined.
+    Symbols are kept in the grammar even if every reference to them is inlined.
+    '''
+    return GrammarOptimizer(grammar).optimize()
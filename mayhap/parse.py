@@ -14,11 +14,14 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
-from os.path import isfile
+from functools import lru_cache
+from os import getpid, replace, stat
+from os.path import abspath, isfile, join
+import pickle
 import re
+from sys import intern
 
-from pyparsing import (Combine,
-                       Forward,
+from pyparsing import (Forward,
                        Literal,
                        OneOrMore,
                        Optional,
@@ -27,6 +30,7 @@ from pyparsing import (Combine,
                        StringStart,
                        Suppress,
                        QuotedString,
+                       Regex,
                        Word,
                        ZeroOrMore,
                        alphas,
@@ -46,9 +50,14 @@ from .tokens import (LiteralToken,
                      WeightToken)
 
 
-def word_excluding(exclude_chars):
-    return Word(printables + ' ',
-                exclude_chars=exclude_chars).leave_whitespace()
+def text_excluding(exclude_chars):
+    '''
+    Match a run of printable characters and spaces, excluding the given
+    characters. The run is scanned by a single compiled regular expression
+    rather than by combining individual words.
+    '''
+    chars = ''.join(sorted(set(printables + ' ') - set(exclude_chars)))
+    return Regex(f'[{re.escape(chars)}]+').leave_whitespace()
 
 
 def parse_literal_action(toks):
@@ -78,20 +87,23 @@ def parse_range_alpha_action(toks):
     return RangeToken(range(start, stop), alpha=True)
 
 
+# Symbol, variable, and modifier names are interned so that the many lookups
+# made with them while generating can compare keys by identity
+
 def parse_symbol_action(toks):
-    return SymbolToken(toks[0])
+    return SymbolToken(intern(toks[0]))
 
 
 def parse_variable_action(toks):
-    return VariableToken(toks[0])
+    return VariableToken(intern(toks[0]))
 
 
 def parse_assignment_echo_action(toks):
-    return AssignmentToken(toks[0], tuple(toks[1:]), echo=True)
+    return AssignmentToken(intern(toks[0]), tuple(toks[1:]), echo=True)
 
 
 def parse_assignment_silent_action(toks):
-    return AssignmentToken(toks[0], tuple(toks[1:]), echo=False)
+    return AssignmentToken(intern(toks[0]), tuple(toks[1:]), echo=False)
 
 
 def parse_choices_action(toks):
@@ -101,7 +113,7 @@ def parse_choices_action(toks):
 
 def parse_modifiers_action(toks):
     token = toks[0]
-    modifiers = toks[1:]
+    modifiers = [intern(modifier) for modifier in toks[1:]]
 
     if not modifiers:
         if isinstance(token, LiteralToken):
@@ -173,7 +185,7 @@ E_SPECIAL = Forward()
 
 E_BLOCK = Suppress('[') + E_SPECIAL + Suppress(']')
 
-E_UNQUOTED_TEXT = Combine(OneOrMore(word_excluding('"[]'))).leave_whitespace()
+E_UNQUOTED_TEXT = text_excluding('"[]')
 E_UNQUOTED_TOKEN = Forward()
 
 E_LITERAL = QuotedString("'", esc_char='\\', multiline=True)
@@ -220,7 +232,7 @@ E_SPECIAL <<= E_ASSIGNMENT | E_CHOICES | E_MODDED
 
 E_UNQUOTED_TOKEN <<= (E_UNQUOTED_TEXT | E_BLOCK).leave_whitespace()
 
-E_TEXT = Combine(OneOrMore(word_excluding('|^[]'))).leave_whitespace()
+E_TEXT = text_excluding('|^[]')
 E_TOKEN = (E_TEXT | E_BLOCK).leave_whitespace()
 
 E_RULE <<= ZeroOrMore(E_TOKEN) + Optional(E_WEIGHT)
@@ -229,14 +241,14 @@ E_RULE.add_parse_action(parse_rule_action)
 E_RULE_LINE = StringStart() + E_RULE + StringEnd()
 
 
-# Matches the name of a generator to import when parsing a grammar
+# Matches a line of a grammar in one pass, separating its indentation, its
+# content, and any trailing comment (starting with an unescaped hash)
+# Unindented content starting with @ names a generator to import
+# e.g. \trule # hello world
 # e.g. @generator_name
 # e.g. @/home/username/generator_name.mh
-RE_IMPORT = re.compile(r'@(.+)')
-
-# Matches comments (lines starting with a hash)
-# e.g. \t# hello world
-RE_COMMENT = re.compile(r'(^|[^\\])(#.*)')
+RE_LINE = re.compile(r'(?P<indent>\s*)(?P<content>.*?)\s*(?:(?<!\\)#.*)?',
+                     re.DOTALL)
 
 # Matches a backslash-escaped character
 # e.g. \[, \n, \\
@@ -245,10 +257,19 @@ RE_ESCAPE = re.compile(r'\\(.)')
 # All characters special to Mayhap that can be escaped with a backslash
 SPECIAL_CHARS = set('"^[]|')
 
+# Matches rules made up of nothing but plain text, which need no parsing
+# Mirrors the printable characters accepted by E_TEXT, minus backslashes
+# e.g. a big red barn
+RE_PLAIN_RULE = re.compile(r'(?:[!-Z_-{}~][ -Z_-{}~]*)?')
+
 
+@lru_cache(maxsize=8192)
 def parse_rule(string):
     '''
     Parses an production rule into a weight and a production string.
+
+    Results are cached, since the same rule text often recurs across a grammar
+    and across inputs. Parsed rules are never modified, so they may be shared.
     '''
     def escape_repl(match):
         if match[1] == "'":
@@ -260,6 +281,11 @@ def parse_rule(string):
                                  .decode('unicode_escape'))
         return f"['{unescaped}']"
 
+    # Plain text rules are common, so skip the parser when there are no blocks,
+    # weights, or escapes to handle
+    if RE_PLAIN_RULE.fullmatch(string):
+        return Rule([string] if string else None)
+
     string = RE_ESCAPE.sub(escape_repl, string)
     try:
         return E_RULE_LINE.parse_with_tabs().parse_string(string)[0]
@@ -307,14 +333,117 @@ def validate_grammar(grammar):
             validate_rule(rule, grammar, variables)
 
 
-def import_grammar(import_file_name):
+# The version of the layout of cached grammars
+# Increment whenever Rule or any Token changes shape, so that grammars cached
+# by older versions are parsed again
+CACHE_VERSION = 4
+
+
+def get_signature(file_name):
+    '''
+    Return a signature that changes whenever the given file is modified, or
+    None if the file cannot be inspected (e.g. <stdin>).
+    '''
+    try:
+        file_stat = stat(file_name)
+    except OSError:
+        return None
+    return (file_stat.st_mtime_ns, file_stat.st_size)
+
+
+def load_cached_grammar(file_name, base_dir=''):
+    '''
+    Load the grammar cached for the given file, along with the signatures of
+    every file it was parsed from. Return None if there is no cache, if the
+    file or anything it imports has changed since the cache was written, or if
+    its imports were resolved from a different base directory.
+    '''
+    try:
+        with open(f'{file_name}.cache', 'rb') as cache_file:
+            version, cached_base_dir, signatures, grammar = \
+                pickle.load(cache_file)
+        if version != CACHE_VERSION or cached_base_dir != abspath(base_dir):
+            return None
+        for name, signature in signatures:
+            if get_signature(name) != signature:
+                return None
+    # A broken cache must never stop a grammar from loading
+    except Exception:  # pylint: disable=broad-except
+        return None
+    return signatures, grammar
+
+
+def save_cached_grammar(file_name, signatures, grammar, base_dir=''):
+    '''
+    Cache the given grammar parsed from the given file, along with the
+    signatures of every file it was parsed from and the base directory its
+    imports were resolved from. Failing to write the cache is not an error.
+    '''
+    cache_file_name = f'{file_name}.cache'
+    # Write to a temporary file first so other processes never read a
+    # partially written cache
+    temp_file_name = f'{cache_file_name}.{getpid()}'
+    try:
+        with open(temp_file_name, 'wb') as cache_file:
+            pickle.dump((CACHE_VERSION, abspath(base_dir), signatures,
+                         grammar),
+                        cache_file, pickle.HIGHEST_PROTOCOL)
+        replace(temp_file_name, cache_file_name)
+    except OSError:
+        pass
+
+
+def load_grammar(grammar_file, file_name, cache=False, signatures=None,
+                 base_dir=''):
+    '''
+    Parse the grammar in the given open file, which has the given name. If
+    cache is true, reuse the grammar cached beside the file when it is up to
+    date, and cache it otherwise. If a list of signatures is given, the
+    signatures of the file and of everything it imports are appended to it.
+    Imports are resolved relative to the given base directory.
+    '''
+    if cache:
+        cached = load_cached_grammar(file_name, base_dir)
+        if cached is not None:
+            file_signatures, grammar = cached
+            if signatures is not None:
+                signatures.extend(file_signatures)
+            return grammar
+
+    # Signatures are only needed to validate caches, so skip the stat calls
+    # when nothing will be cached
+    if cache or signatures is not None:
+        file_signatures = [(abspath(file_name), get_signature(file_name))]
+    else:
+        file_signatures = None
+    grammar = parse_grammar(grammar_file, cache, file_signatures, base_dir)
+
+    # A cache that cannot be checked against its files must not be written
+    if cache and all(signature is not None
+                     for _, signature in file_signatures):
+        save_cached_grammar(file_name, file_signatures, grammar, base_dir)
+    if signatures is not None:
+        signatures.extend(file_signatures)
+    return grammar
+
+
+def import_grammar(import_file_name, cache=False, signatures=None,
+                   base_dir=''):
+    '''
+    Parse the grammar in the given file, as with load_grammar. The file name is
+    relative to the given base directory.
+    '''
+    import_path = join(base_dir, import_file_name)
     # Default to .mh extension if not specified
-    if not isfile(import_file_name) and not import_file_name.endswith('.mh'):
+    if not isfile(import_path) and not import_file_name.endswith('.mh'):
         import_file_name = f'{import_file_name}.mh'
+        import_path = f'{import_path}.mh'
+
     try:
-        with open(import_file_name) as import_file:
+        with open(import_path) as import_file:
             try:
-                return parse_grammar(import_file)
+                return load_grammar(import_file, import_path, cache,
+                                    signatures, base_dir)
             except MayhapError as e:
                 raise MayhapError('Error while importing grammar from '
                                   f'{import_file_name}: {e}') from e
@@ -323,30 +452,36 @@ def import_grammar(import_file_name):
                           f'{import_file_name}: {e}') from e
 
 
-def parse_grammar(lines):
+def parse_grammar(lines, cache=False, signatures=None, base_dir=''):
+    '''
+    Parse a grammar from the given lines. Imported grammars are loaded with
+    import_grammar, passing along the given cache flag, signature list, and
+    base directory.
+    '''
     current_symbol = None
     grammar = {}
     for i, line in enumerate(lines):
-        stripped = line.strip()
+        # Most lines have no comment, and need no regex to split
+        if '#' in line:
+            match = RE_LINE.fullmatch(line)
+            stripped = match['content']
+            indented = bool(match['indent'])
+        else:
+            stripped = line.strip()
+            indented = line[:1].isspace()
         if stripped:
-            # Strip trailing comments
-            match = RE_COMMENT.search(stripped)
-            if match:
-                stripped = stripped[:match.start(2)].strip()
-                if not stripped:
-                    continue
-
-            match = RE_IMPORT.match(line)
-            if match:
-                import_file_name = match[1]
+
+            if not indented and stripped.startswith('@'):
+                import_file_name = stripped[1:]
                 try:
-                    grammar |= import_grammar(import_file_name)
+                    grammar |= import_grammar(import_file_name, cache,
+                                              signatures, base_dir)
                 except MayhapError as e:
                     raise MayhapGrammarError(str(e), i + 1, line) from e
                 continue
 
             # Indented lines contain production rules
-            if line[0].isspace():
+            if indented:
                 if current_symbol is None:
                     raise MayhapGrammarError('Production rule given before '
                                              'symbol', i + 1, line)
@@ -355,7 +490,7 @@ def parse_grammar(lines):
                     rule = parse_rule(stripped)
                 except MayhapError as e:
                     raise MayhapGrammarError(str(e), i + 1, line) from e
-                grammar[current_symbol].add(rule)
+                grammar[current_symbol].append(rule)
 
             # Unindented lines contain symbols
             else:
@@ -364,14 +499,14 @@ def parse_grammar(lines):
                                              'closed with no production rules',
                                              i + 1, line)
 
-                current_symbol = stripped
+                current_symbol = intern(stripped)
 
                 if len(E_SYMBOL.search_string(current_symbol)) != 1:
                     raise MayhapGrammarError('Invalid symbol name: '
                                              f'{current_symbol}',
                                              i + 1, line)
 
-                grammar[current_symbol] = set()
+                grammar[current_symbol] = []
 
     if current_symbol and not grammar[current_symbol]:
         raise MayhapGrammarError(f'Symbol "{current_symbol}" closed with no '
@@ -381,9 +516,9 @@ def parse_grammar(lines):
 
 
 def grammar_to_string(grammar):
-    string = ''
+    lines = []
     for symbol, rules in grammar.items():
-        string += f'{symbol}\n'
+        lines.append(f'{symbol}\n')
         for rule in rules:
-            string += f'\t{rule}\n'
-    return string
+            lines.append(f'\t{rule}\n')
+    return ''.join(lines)
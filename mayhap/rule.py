@@ -14,9 +14,11 @@
 # You should have received a copy of the GNU Lesser General Public License
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
+from bisect import bisect
+from itertools import accumulate
 import random
 
-from .common import join_as_strings
+from .common import MayhapError, join_as_strings
 
 
 # The default weight for rules with no explicit weight
@@ -24,6 +26,8 @@ DEFAULT_WEIGHT = 1.0
 
 
 class Rule:
+    __slots__ = ('tokens', 'weight')
+
     def __init__(self, tokens=None, weight=DEFAULT_WEIGHT):
         self.tokens = tuple(tokens) if tokens else tuple()
         self.weight = weight
@@ -43,11 +47,30 @@ class Rule:
         return hash(self.tokens)
 
 
-def choose_rule(rules):
+def accumulate_weights(rules):
+    '''
+    Return the cumulative weights of the given list of rules, so that repeated
+    choices between them need not rebuild their weights. If the rules are all
+    given the same positive weight, return None, as they can be chosen between
+    uniformly.
+    '''
+    weights = {rule.weight for rule in rules}
+    if len(weights) == 1 and weights.pop() > 0:
+        return None
+    return tuple(accumulate(rule.weight for rule in rules))
+
+
+def choose_weighted(population, cum_weights):
     '''
-    Choose a production from the given weighted list of rules.
+    Choose an item from the given sequence, using cumulative weights from
+    accumulate_weights.
     '''
-    rules_tuple = tuple(rules)
-    weights = [rule.weight for rule in rules_tuple]
-    rule = random.choices(rules_tuple, weights)[0]
-    return rule
+    if cum_weights is None:
+        return random.choice(population)
+    total = cum_weights[-1]
+    if total <= 0:
+        raise MayhapError('Cannot choose from rules that all have zero weight')
+    # Draws exactly as random.choices does, without its per-call argument
+    # handling and list building
+    hi = len(cum_weights) - 1
+    return population[bisect(cum_weights, random.random() * total, 0, hi)]
@@ -15,7 +15,7 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 from cmd import Cmd
-from copy import deepcopy
+from sys import intern, stderr
 
 from .common import MayhapError, join_as_strings, print_error
 from .parse import grammar_to_string, import_grammar, parse_rule
@@ -32,9 +32,11 @@ def filter_completions(command, completions):
 
 
 class MayhapShell(Cmd):
-    def __init__(self, generator):
+    def __init__(self, generator, base_dir=''):
         super().__init__()
         self.generator = generator
+        # The directory that imported paths are relative to
+        self.base_dir = base_dir
         self.prompt = '> '
 
     @property
@@ -105,18 +107,22 @@ class MayhapShell(Cmd):
         if not arg:
             print('Usage: add [symbol] [rule]')
             return
-        terms = arg.split(' ')
-        symbol = terms[0]
-        if symbol in self.generator.grammar:
-            if len(terms) == 1:
-                print(f'Symbol "{symbol}" already exists')
-                return
-        else:
-            self.generator.grammar[symbol] = set()
-        if len(terms) > 1:
-            rule_string = arg[len(symbol):].strip()
+        symbol, _, rule_string = arg.partition(' ')
+        # Intern new symbols like the parser does, so that they match the
+        # interned names in symbol tokens by identity
+        symbol = intern(symbol)
+        rule_string = rule_string.lstrip()
+        grammar = self.generator.grammar
+        rules = grammar.get(symbol)
+        if rules is None:
+            rules = grammar[symbol] = []
+        elif not rule_string:
+            print(f'Symbol "{symbol}" already exists', file=stderr)
+            return
+        if rule_string:
             rule = parse_rule(rule_string)
-            self.generator.grammar[symbol].add(rule)
+            rules.append(rule)
+            self.generator.invalidate(symbol)
 
     def do_remove(self, arg):
         '''
@@ -126,27 +132,31 @@ class MayhapShell(Cmd):
             print('Usage: remove [symbol] [rule]')
             return
 
-        terms = arg.split(' ')
-        if len(terms) > 2:
-            print('Usage: remove [symbol] [rule]')
+        symbol, _, rule_string = arg.partition(' ')
+        rule_string = rule_string.lstrip()
+        grammar = self.generator.grammar
+        rules = grammar.get(symbol)
+        if rules is None:
+            print(f'Symbol "{symbol}" does not exist', file=stderr)
             return
 
-        symbol = terms[0]
-        if symbol not in self.generator.grammar:
-            print(f'Symbol "{symbol}" does not exist')
+        if not rule_string:
+            del grammar[symbol]
+            self.generator.invalidate(symbol)
             return
 
-        if len(terms) == 1:
-            self.generator.grammar.remove(symbol)
+        # Compare parsed rules rather than formatting every rule as a string,
+        # which also lets the weight be omitted as it can be in add
+        try:
+            rules.remove(parse_rule(rule_string))
+        except MayhapError as e:
+            print_error(e, self.generator.verbose)
             return
-
-        rule_string = arg[len(symbol):].strip()
-        rules = self.generator.grammar[symbol]
-        for rule in rules:
-            if str(rule) == rule_string:
-                rules.remove(rule)
-                return
-        print(f'Symbol "{symbol}" has no rule "{rule_string}"')
+        except ValueError:
+            print(f'Symbol "{symbol}" has no rule "{rule_string}"',
+                  file=stderr)
+            return
+        self.generator.invalidate(symbol)
 
     def do_import(self, arg):
         '''
@@ -158,9 +168,10 @@ class MayhapShell(Cmd):
             print('Usage: import [path to grammar file]')
             return
         try:
-            imported_grammar = import_grammar(arg)
+            imported_grammar = import_grammar(arg, base_dir=self.base_dir)
             self.generator.grammar |= imported_grammar
-            self.generator.unused |= deepcopy(imported_grammar)
+            for symbol in imported_grammar:
+                self.generator.invalidate(symbol)
         except MayhapError as e:
             print_error(e, self.generator.verbose)
 
@@ -15,13 +15,17 @@
 # along with this program.  If not, see <https://www.gnu.org/licenses/>.
 
 from .common import MayhapError, join_as_strings
+from .rule import accumulate_weights
 
 
 class Token:
-    pass
+    # Grammars hold many small tokens, so none of them carry a __dict__
+    __slots__ = ()
 
 
 class LiteralToken(Token):
+    __slots__ = ('string', 'modifiers')
+
     def __init__(self, string, modifiers=None):
         self.string = string
         self.modifiers = tuple(modifiers) if modifiers else tuple()
@@ -45,6 +49,8 @@ class LiteralToken(Token):
 
 
 class PatternToken(Token):
+    __slots__ = ('tokens', 'modifiers')
+
     def __init__(self, tokens, modifiers=None):
         self.tokens = tuple(tokens)
         self.modifiers = tuple(modifiers) if modifiers else tuple()
@@ -67,11 +73,25 @@ class PatternToken(Token):
         return hash(self.tokens)
 
 
+# The largest numeric range whose values are rendered up front
+MAX_RANGE_VALUES = 1024
+
+
 class RangeToken(Token):
+    __slots__ = ('range', 'alpha', 'modifiers', 'values')
+
     def __init__(self, range_value, alpha, modifiers=None):
         self.range = range_value
         self.alpha = alpha
         self.modifiers = tuple(modifiers) if modifiers else tuple()
+        # Draws pick from the rendered values when there are few enough of
+        # them, rather than formatting a fresh string each time
+        if alpha:
+            self.values = tuple(map(chr, range_value))
+        elif len(range_value) <= MAX_RANGE_VALUES:
+            self.values = tuple(map(str, range_value))
+        else:
+            self.values = None
 
     @property
     def start(self):
@@ -105,6 +125,8 @@ class RangeToken(Token):
 
 
 class SymbolToken(Token):
+    __slots__ = ('symbol', 'modifiers')
+
     def __init__(self, symbol, modifiers=None):
         self.symbol = symbol
         self.modifiers = tuple(modifiers) if modifiers else tuple()
@@ -128,6 +150,8 @@ class SymbolToken(Token):
 
 
 class VariableToken(Token):
+    __slots__ = ('variable', 'modifiers')
+
     def __init__(self, variable, modifiers=None):
         self.variable = variable
         self.modifiers = tuple(modifiers) if modifiers else tuple()
@@ -149,6 +173,8 @@ class VariableToken(Token):
 
 
 class AssignmentToken(Token):
+    __slots__ = ('variable', 'value', 'echo')
+
     def __init__(self, variable, value, echo):
         self.variable = variable
         self.value = tuple(value)
@@ -175,8 +201,13 @@ class AssignmentToken(Token):
 
 
 class ChoiceToken(Token):
+    __slots__ = ('rules', 'cum_weights')
+
     def __init__(self, rules):
         self.rules = tuple(rules)
+        # Choices are made from the same rules on every evaluation, so their
+        # weights are accumulated once up front
+        self.cum_weights = accumulate_weights(self.rules)
 
     def __str__(self):
         return f'[{join_as_strings(self.rules, delimiter="|")}]'
@@ -193,6 +224,8 @@ class ChoiceToken(Token):
 
 
 class WeightToken:
+    __slots__ = ('weight',)
+
     def __init__(self, weight):
         if weight < 0:
             raise MayhapError(f'Weight must be non-negative; was {weight}')
@@ -2,13 +2,15 @@ from unittest import TestCase
 
 from mayhap.common import MayhapError
 from mayhap.generator import MayhapGenerator
-from mayhap.modifiers import (MOD_ARTICLE,
+from mayhap.modifiers import (MOD_MUNDANE,
+                              MOD_ARTICLE,
                               MOD_PLURAL,
                               MOD_ORDINAL,
                               MOD_CAPITALIZE,
                               MOD_LOWER,
                               MOD_UPPER,
-                              MOD_TITLE)
+                              MOD_TITLE,
+                              get_plural)
 from mayhap.rule import Rule
 from mayhap.tokens import (AssignmentToken,
                            ChoiceToken,
@@ -82,9 +84,9 @@ class TestGenerate(TestCase):
         Evaluating a symbol token: [symbol]
         '''
         generator = MayhapGenerator({
-            'symbol': set([
+            'symbol': [
                 Rule(['rule']),
-            ]),
+            ],
         })
         expected = 'rule'
         actual = generator.evaluate_token(SymbolToken('symbol'))
@@ -150,6 +152,63 @@ class TestGenerate(TestCase):
                                                        Rule(['choice2'])]))
         self.assertTrue(actual in ('choice1', 'choice2'))
 
+    def test_choices_weight(self):
+        '''
+        Evaluating choices with only one possible rule:
+        [possible|impossible^0]
+        '''
+        generator = MayhapGenerator()
+        expected = 'possible'
+        for _ in range(10):
+            actual = generator.evaluate_token(ChoiceToken([
+                Rule(['possible']),
+                Rule(['impossible'], weight=0.0),
+            ]))
+            self.assertEqual(expected, actual)
+
+    def test_choices_weight_zero(self):
+        '''
+        Evaluating choices with no possible rules: [impossible^0]
+        '''
+        generator = MayhapGenerator()
+        with self.assertRaises(MayhapError):
+            generator.evaluate_token(ChoiceToken([
+                Rule(['impossible'], weight=0.0),
+            ]))
+
+    def test_symbol_weight_unique(self):
+        '''
+        Evaluating a symbol repeatedly once its only possible rule is used:
+        [symbol] [symbol] [symbol]
+        '''
+        grammar = {
+            'symbol': [
+                Rule(['possible']),
+                Rule(['impossible'], weight=0.0),
+            ],
+        }
+        generator = MayhapGenerator(grammar)
+        expected = 'possible possible possible'
+        actual = generator.evaluate_input('[symbol] [symbol] [symbol]')
+        self.assertEqual(expected, actual)
+
+    def test_symbol_mundane_unique(self):
+        '''
+        Evaluating a symbol after a mundane production of it:
+        [symbol.mundane] [symbol]
+        '''
+        grammar = {
+            'symbol': [
+                Rule(['a']),
+                Rule(['b']),
+            ],
+        }
+        generator = MayhapGenerator(grammar)
+        for _ in range(20):
+            actual = generator.evaluate_input('[symbol.mundane] [symbol]')
+            self.assertIn(actual, ('a b', 'b a'))
+            generator.reset()
+
     def test_mod_article(self):
         '''
         Evaluating a literal with the indefinite article modifier:
@@ -229,20 +288,59 @@ class TestGenerate(TestCase):
             modifiers=[MOD_TITLE]))
         self.assertEqual(expected, actual)
 
+    def test_mod_chain(self):
+        '''
+        Evaluating a literal with multiple modifiers: ['cat'.s.upper]
+        '''
+        generator = MayhapGenerator()
+        expected = 'CATS'
+        actual = generator.evaluate_token(LiteralToken(
+            'cat',
+            modifiers=[MOD_PLURAL, MOD_UPPER]))
+        self.assertEqual(expected, actual)
+
+    def test_mod_unknown(self):
+        '''
+        Evaluating a literal with an unknown modifier: ['cat'.unknown]
+        '''
+        generator = MayhapGenerator()
+        with self.assertRaises(MayhapError):
+            generator.evaluate_token(LiteralToken(
+                'cat',
+                modifiers=['unknown']))
+
     def test_weight(self):
         '''
         Evaluating a symbol with only one possible rule.
         '''
         generator = MayhapGenerator({
-            'symbol': set([
+            'symbol': [
                 Rule(['possible'], weight=1.0),
                 Rule(['impossible'], weight=0.0),
-            ]),
+            ],
         })
         expected = 'possible'
         actual = generator.evaluate_input('symbol')
         self.assertEqual(expected, actual)
 
+    def test_weight_mundane(self):
+        '''
+        Evaluating a mundane symbol with only one possible rule:
+        [symbol.mundane]
+        '''
+        generator = MayhapGenerator({
+            'symbol': [
+                Rule(['possible'], weight=1.0),
+                Rule(['impossible'], weight=0.0),
+            ],
+        })
+        expected = 'possible'
+        for _ in range(10):
+            actual = generator.evaluate_token(SymbolToken(
+                'symbol',
+                modifiers=[MOD_MUNDANE]))
+            self.assertEqual(expected, actual)
+
     def test_pattern_string(self):
         '''
         Evaluating a literal string pattern: string
@@ -252,6 +350,48 @@ class TestGenerate(TestCase):
         actual = generator.evaluate_input('string')
         self.assertEqual(expected, actual)
 
+    def test_dynamic_plural(self):
+        '''
+        Evaluating a dynamic plural after a number: 2 cat(s)
+        '''
+        generator = MayhapGenerator()
+        expected = '2 cats'
+        actual = generator.evaluate_input('2 cat(s)')
+        self.assertEqual(expected, actual)
+
+    def test_dynamic_plural_singular(self):
+        '''
+        Evaluating a dynamic plural after the number one: 1 cat(s)
+        '''
+        generator = MayhapGenerator()
+        expected = '1 cat'
+        actual = generator.evaluate_input('1 cat(s)')
+        self.assertEqual(expected, actual)
+
+    def test_dynamic_plural_decimal(self):
+        '''
+        Evaluating dynamic plurals after equal integer and decimal numbers, in
+        either order: 1 cat(s) 1.0 cat(s)
+        '''
+        generator = MayhapGenerator()
+        results = []
+        for patterns in (['1 cat(s)', '1.0 cat(s)'],
+                         ['1.0 cat(s)', '1 cat(s)']):
+            get_plural.cache_clear()
+            results.append({pattern: generator.evaluate_input(pattern)
+                            for pattern in patterns})
+        self.assertEqual(results[0], results[1])
+        self.assertEqual('1 cat', results[0]['1 cat(s)'])
+
+    def test_dynamic_plural_start(self):
+        '''
+        Evaluating a dynamic plural at the start of a pattern: cat(s)
+        '''
+        generator = MayhapGenerator()
+        expected = 'cats'
+        actual = generator.evaluate_input('cat(s)')
+        self.assertEqual(expected, actual)
+
     def test_undefined_symbol(self):
         '''
         Evaluating a symbol that does not exist: [symbol]
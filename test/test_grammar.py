@@ -1,19 +1,27 @@
+from os import listdir
+from os.path import isfile, join
+from tempfile import TemporaryDirectory
 from unittest import TestCase
 
 from mayhap.common import MayhapGrammarError
-from mayhap.parse import parse_grammar
+from mayhap.parse import import_grammar, load_grammar, parse_grammar
 from mayhap.rule import Rule
 
 
+def write_file(file_name, contents):
+    with open(file_name, 'w') as output_file:
+        output_file.write(contents)
+
+
 class TestGrammar(TestCase):
     def test_one_rule(self):
         '''
         Parsing a grammar with one symbol and one rule.
         '''
         expected = {
-            'symbol': set([
+            'symbol': [
                 Rule(['rule']),
-            ]),
+            ],
         }
         actual = parse_grammar([
             'symbol',
@@ -26,11 +34,11 @@ class TestGrammar(TestCase):
         Parsing a grammar with one symbol and multiple rules.
         '''
         expected = {
-            'symbol': set([
+            'symbol': [
                 Rule(['rule1']),
                 Rule(['rule2']),
                 Rule(['rule3']),
-            ]),
+            ],
         }
         actual = parse_grammar([
             'symbol',
@@ -45,12 +53,12 @@ class TestGrammar(TestCase):
         Parsing a grammar with multiple symbols and rules.
         '''
         expected = {
-            'symbol1': set([
+            'symbol1': [
                 Rule(['rule1']),
-            ]),
-            'symbol2': set([
+            ],
+            'symbol2': [
                 Rule(['rule2']),
-            ]),
+            ],
         }
         actual = parse_grammar([
             'symbol1',
@@ -65,12 +73,12 @@ class TestGrammar(TestCase):
         Parsing a grammar with multiple symbols and rules, with blank lines.
         '''
         expected = {
-            'symbol1': set([
+            'symbol1': [
                 Rule(['rule1']),
-            ]),
-            'symbol2': set([
+            ],
+            'symbol2': [
                 Rule(['rule2']),
-            ]),
+            ],
         }
         actual = parse_grammar([
             'symbol1',
@@ -87,9 +95,9 @@ class TestGrammar(TestCase):
         Parsing a grammar with a comment on its own line.
         '''
         expected = {
-            'symbol': set([
+            'symbol': [
                 Rule(['rule']),
-            ]),
+            ],
         }
         actual = parse_grammar([
             '# comment',
@@ -103,9 +111,9 @@ class TestGrammar(TestCase):
         Parsing a grammar with inline comments.
         '''
         expected = {
-            'symbol': set([
+            'symbol': [
                 Rule(['rule']),
-            ]),
+            ],
         }
         actual = parse_grammar([
             'symbol # comment',
@@ -113,6 +121,21 @@ class TestGrammar(TestCase):
         ])
         self.assertEqual(expected, actual)
 
+    def test_escaped_comment(self):
+        '''
+        Parsing a grammar with a backslash-escaped hash.
+        '''
+        expected = {
+            'symbol': [
+                Rule(['rule # not a comment']),
+            ],
+        }
+        actual = parse_grammar([
+            'symbol',
+            '\trule \\# not a comment # comment',
+        ])
+        self.assertEqual(expected, actual)
+
     def test_rule_before_symbol(self):
         '''
         Parsing a grammar with a rule given before its symbol.
@@ -141,3 +164,83 @@ class TestGrammar(TestCase):
                 'symbol with spaces',
                 '\trule',
             ])
+
+    def test_import_cache(self):
+        '''
+        Importing a grammar with caching, before and after modifying it.
+        '''
+        with TemporaryDirectory() as directory:
+            file_name = join(directory, 'grammar.mh')
+            write_file(file_name, 'symbol\n\trule\n')
+
+            expected = {
+                'symbol': [
+                    Rule(['rule']),
+                ],
+            }
+            actual = import_grammar(file_name, cache=True)
+            self.assertEqual(expected, actual)
+            self.assertTrue(isfile(f'{file_name}.cache'))
+            actual = import_grammar(file_name, cache=True)
+            self.assertEqual(expected, actual)
+
+            write_file(file_name, 'symbol\n\tmodified rule\n')
+            expected = {
+                'symbol': [
+                    Rule(['modified rule']),
+                ],
+            }
+            actual = import_grammar(file_name, cache=True)
+            self.assertEqual(expected, actual)
+
+    def test_import_cache_nested(self):
+        '''
+        Importing a grammar with caching, after modifying a grammar it imports.
+        '''
+        with TemporaryDirectory() as directory:
+            file_name = join(directory, 'grammar.mh')
+            imported_file_name = join(directory, 'imported.mh')
+            write_file(file_name, f'@{imported_file_name}\n')
+            write_file(imported_file_name, 'symbol\n\trule\n')
+            import_grammar(file_name, cache=True)
+
+            write_file(imported_file_name, 'symbol\n\tmodified rule\n')
+            expected = {
+                'symbol': [
+                    Rule(['modified rule']),
+                ],
+            }
+            actual = import_grammar(file_name, cache=True)
+            self.assertEqual(expected, actual)
+
+    def test_load_cache_unnamed(self):
+        '''
+        Loading a grammar with caching from a file that cannot be inspected,
+        such as standard input.
+        '''
+        with TemporaryDirectory() as directory:
+            file_name = join(directory, '<stdin>')
+            expected = {
+                'symbol': [
+                    Rule(['rule']),
+                ],
+            }
+            actual = load_grammar(['symbol', '\trule'], file_name, cache=True)
+            self.assertEqual(expected, actual)
+            self.assertEqual([], listdir(directory))
+
+    def test_import_base_dir(self):
+        '''
+        Importing a grammar that imports another by a relative path: @imported
+        '''
+        with TemporaryDirectory() as directory:
+            write_file(join(directory, 'grammar.mh'), '@imported\n')
+            write_file(join(directory, 'imported.mh'), 'symbol\n\trule\n')
+
+            expected = {
+                'symbol': [
+                    Rule(['rule']),
+                ],
+            }
+            actual = import_grammar('grammar', base_dir=directory)
+            self.assertEqual(expected, actual)
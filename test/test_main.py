@@ -0,0 +1,35 @@
+from os.path import dirname
+from subprocess import run
+from sys import executable
+from unittest import TestCase
+
+
+# Run the package from the repository root, wherever the tests are run from
+ROOT = dirname(dirname(__file__))
+
+
+def run_mayhap(args, input_string):
+    return run([executable, '-m', 'mayhap', *args], cwd=ROOT,
+               input=input_string, capture_output=True, text=True,
+               check=False)
+
+
+class TestMain(TestCase):
+    def test_grammar_stdin(self):
+        '''
+        Reading the grammar from standard input: mayhap - symbol
+        '''
+        result = run_mayhap(['-', 'symbol'], 'symbol\n\trule\n')
+        self.assertEqual('', result.stderr)
+        self.assertEqual('rule\n', result.stdout)
+        self.assertEqual(0, result.returncode)
+
+    def test_grammar_stdin_cache(self):
+        '''
+        Reading the grammar from standard input with caching: mayhap -c -
+        symbol
+        '''
+        result = run_mayhap(['-c', '-', 'symbol'], 'symbol\n\trule\n')
+        self.assertEqual('', result.stderr)
+        self.assertEqual('rule\n', result.stdout)
+        self.assertEqual(0, result.returncode)
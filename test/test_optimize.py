@@ -0,0 +1,121 @@
+from unittest import TestCase
+
+from mayhap.generator import MayhapGenerator
+from mayhap.modifiers import MOD_UPPER
+from mayhap.optimize import optimize_grammar
+from mayhap.rule import Rule
+from mayhap.tokens import (ChoiceToken,
+                           PatternToken,
+                           SymbolToken,
+                           VariableToken)
+
+
+class TestOptimize(TestCase):
+    def test_inline_symbol(self):
+        '''
+        Optimizing a reference to a symbol with one rule: [symbol] text
+        '''
+        grammar = {
+            'origin': [
+                Rule([SymbolToken('symbol'), ' text']),
+            ],
+            'symbol': [
+                Rule(['rule']),
+            ],
+        }
+        expected = [Rule(['rule text'])]
+        actual = optimize_grammar(grammar)['origin']
+        self.assertEqual(expected, actual)
+
+    def test_inline_symbol_modded(self):
+        '''
+        Optimizing a modded reference to a symbol with one rule:
+        [symbol.upper]
+        '''
+        grammar = {
+            'origin': [
+                Rule([SymbolToken('symbol', modifiers=[MOD_UPPER])]),
+            ],
+            'symbol': [
+                Rule(['rule']),
+            ],
+        }
+        expected = [Rule(['RULE'])]
+        actual = optimize_grammar(grammar)['origin']
+        self.assertEqual(expected, actual)
+
+    def test_inline_symbol_dynamic(self):
+        '''
+        Optimizing a reference to a symbol whose one rule is not constant:
+        [symbol]
+        '''
+        grammar = {
+            'origin': [
+                Rule([SymbolToken('symbol')]),
+            ],
+            'symbol': [
+                Rule(['rule ', VariableToken('variable')]),
+            ],
+        }
+        expected = [Rule([PatternToken(['rule ',
+                                        VariableToken('variable')])])]
+        actual = optimize_grammar(grammar)['origin']
+        self.assertEqual(expected, actual)
+
+    def test_inline_symbol_plural(self):
+        '''
+        Optimizing a reference to a symbol with a dynamic plural: 3 [symbol]
+        '''
+        grammar = {
+            'origin': [
+                Rule(['3 ', SymbolToken('symbol')]),
+            ],
+            'symbol': [
+                Rule(['cat(s)']),
+            ],
+        }
+        expected = MayhapGenerator(grammar).evaluate_input('origin')
+        actual = MayhapGenerator(optimize_grammar(grammar)).evaluate_input(
+            'origin')
+        self.assertEqual(expected, actual)
+
+    def test_multiple_rules(self):
+        '''
+        Optimizing a reference to a symbol with multiple rules: [symbol]
+        '''
+        grammar = {
+            'origin': [
+                Rule([SymbolToken('symbol')]),
+            ],
+            'symbol': [
+                Rule(['rule1']),
+                Rule(['rule2']),
+            ],
+        }
+        actual = optimize_grammar(grammar)
+        self.assertEqual(grammar, actual)
+
+    def test_recursive_symbol(self):
+        '''
+        Optimizing a symbol with one rule that references itself: [symbol]
+        '''
+        grammar = {
+            'symbol': [
+                Rule(['rule', SymbolToken('symbol')]),
+            ],
+        }
+        actual = optimize_grammar(grammar)
+        self.assertEqual(grammar, actual)
+
+    def test_single_choice(self):
+        '''
+        Optimizing a choice with only one rule: text [choice|]
+        '''
+        grammar = {
+            'symbol': [
+                Rule(['text ', ChoiceToken([Rule(['choice'])])]),
+            ],
+        }
+        expected = [Rule(['text choice'])]
+        actual = optimize_grammar(grammar)['symbol']
+        self.assertEqual(expected, actual)
@@ -0,0 +1,90 @@
+from contextlib import redirect_stdout
+from io import StringIO
+from unittest import TestCase
+from unittest.mock import patch
+
+from mayhap.generator import MayhapGenerator
+from mayhap.rule import Rule
+from mayhap.shell import MayhapShell
+from mayhap.tokens import SymbolToken
+
+
+class TestShell(TestCase):
+    def test_remove_rule(self):
+        '''
+        Removing a rule by its pattern: /remove symbol a[b]
+        '''
+        generator = MayhapGenerator({
+            'symbol': [
+                Rule(['a', SymbolToken('b')]),
+                Rule(['c']),
+            ],
+        })
+        shell = MayhapShell(generator)
+        shell.onecmd(shell.precmd('/remove symbol a[b]'))
+        self.assertEqual([Rule(['c'])], generator.grammar['symbol'])
+
+    def test_remove_rule_weight(self):
+        '''
+        Removing a rule by its pattern and weight: /remove symbol c^2
+        '''
+        generator = MayhapGenerator({
+            'symbol': [
+                Rule(['c']),
+                Rule(['c'], 2),
+            ],
+        })
+        shell = MayhapShell(generator)
+        shell.onecmd(shell.precmd('/remove symbol c^2'))
+        self.assertEqual([Rule(['c'])], generator.grammar['symbol'])
+
+    def test_remove_rule_spaces(self):
+        '''
+        Removing a rule containing spaces: /remove symbol a big [b]
+        '''
+        generator = MayhapGenerator({
+            'symbol': [
+                Rule(['a big ', SymbolToken('b')]),
+                Rule(['c']),
+            ],
+        })
+        shell = MayhapShell(generator)
+        shell.onecmd(shell.precmd('/remove symbol a big [b]'))
+        self.assertEqual([Rule(['c'])], generator.grammar['symbol'])
+
+    def test_add_rule(self):
+        '''
+        Adding a rule containing spaces: /add symbol a big [b]
+        '''
+        generator = MayhapGenerator()
+        shell = MayhapShell(generator)
+        shell.onecmd(shell.precmd('/add symbol a big [b]'))
+        expected = [Rule(['a big ', SymbolToken('b')])]
+        self.assertEqual(expected, generator.grammar['symbol'])
+
+    def test_remove_symbol(self):
+        '''
+        Removing a symbol: /remove symbol
+        '''
+        generator = MayhapGenerator({
+            'symbol': [
+                Rule(['c']),
+            ],
+        })
+        shell = MayhapShell(generator)
+        shell.onecmd(shell.precmd('/remove symbol'))
+        self.assertNotIn('symbol', generator.grammar)
+
+    def test_evaluate_empty_symbol(self):
+        '''
+        Evaluating a symbol with no rules: /add symbol, then symbol
+        '''
+        generator = MayhapGenerator()
+        shell = MayhapShell(generator)
+        shell.onecmd(shell.precmd('/add symbol'))
+        output = StringIO()
+        errors = StringIO()
+        with redirect_stdout(output), patch('mayhap.common.stderr', errors):
+            shell.onecmd(shell.precmd('symbol'))
+        self.assertEqual('', output.getvalue())
+        self.assertIn('symbol', errors.getvalue())